@@ -1,12 +1,11 @@
 import gradio as gr
-from functools import partial
 
-from json_schema_extractor.schema_utils import build_tree_from_keys, extract_all_keys
 from json_schema_extractor.handlers_single import (
     export_data_handler,
     handle_root_change_single_dataset,
     load_and_parse_json_with_preview,
     preview_single_dataset_handler,
+    set_selected_fields,
     update_mapping_table_and_clear_preview,
 )
 from json_schema_extractor.handlers_merge import (
@@ -24,7 +23,9 @@ with gr.Blocks(title="JSON Schema Extractor") as demo:
 
     # State
     json_data_state = gr.State()
-    selected_fields_state = gr.State(value=[])
+    selected_fields_state = gr.State(value={})
+    # Sorted field keys of the loaded document, filled in by the upload.
+    schema_keys_state = gr.State(value=[])
     merge_primary_data_state = gr.State()
     merge_secondary_data_state = gr.State()
     merge_primary_keys_state = gr.State(value=[])
@@ -36,47 +37,27 @@ with gr.Blocks(title="JSON Schema Extractor") as demo:
             with gr.Column(scale=1):
                 gr.Markdown("### 1. Import")
                 file_input = gr.File(label="Upload JSON File", file_types=[".json"])
+                full_scan = gr.Checkbox(
+                    label="Full schema scan",
+                    value=False,
+                    info="Walk every record instead of sampling long uniform lists. Slower, but finds fields only a few records have. Files over 50 MB are always scanned in full.",
+                )
                 status_msg = gr.Textbox(label="Status", interactive=False)
 
                 gr.Markdown("### 2. Select Fields")
 
-                @gr.render(inputs=[json_data_state], triggers=[json_data_state.change])
-                def render_schema(data):
+                # Re-render on either state: a re-scan can change the keys of
+                # an otherwise equal document.
+                @gr.render(inputs=[json_data_state, schema_keys_state], triggers=[json_data_state.change, schema_keys_state.change])
+                def render_schema(data, all_keys):
                     if data is None:
                         gr.Markdown("No data loaded.")
                         return
 
-                    all_keys = sorted(list(extract_all_keys(data)))
-                    tree = build_tree_from_keys(all_keys)
-
-                    def on_change(path, is_selected, current_selected):
-                        if is_selected:
-                            if path not in current_selected:
-                                current_selected.append(path)
-                        else:
-                            if path in current_selected:
-                                current_selected.remove(path)
-                        return current_selected
-
-                    def recursive_ui(node, label="root"):
-                        if isinstance(node, dict):
-                            if "__self__" in node:
-                                full_path = node["__self__"]
-                                cb = gr.Checkbox(label=f"{label} (value)", value=False)
-                                cb.change(fn=partial(on_change, full_path), inputs=[cb, selected_fields_state], outputs=[selected_fields_state])
-
-                            with gr.Accordion(label, open=False):
-                                for k, v in node.items():
-                                    if k == "__self__":
-                                        continue
-                                    recursive_ui(v, k)
-                        else:
-                            full_path = node
-                            cb = gr.Checkbox(label=label, value=False)
-                            cb.change(fn=partial(on_change, full_path), inputs=[cb, selected_fields_state], outputs=[selected_fields_state])
-
-                    for k, v in tree.items():
-                        recursive_ui(v, k)
+                    # One widget and one event for the whole schema, rather than
+                    # a checkbox and handler per field.
+                    picker = gr.CheckboxGroup(choices=all_keys, value=[], label="Fields")
+                    picker.change(fn=set_selected_fields, inputs=[picker, selected_fields_state], outputs=[selected_fields_state])
 
             # Right Panel: Output Builder
             with gr.Column(scale=1):
@@ -111,8 +92,15 @@ with gr.Blocks(title="JSON Schema Extractor") as demo:
 
         file_input.upload(
             fn=load_and_parse_json_with_preview,
-            inputs=[file_input],
-            outputs=[json_data_state, selected_fields_state, root_path_selector, status_msg, mapping_table, single_preview, document_count],
+            inputs=[file_input, full_scan],
+            outputs=[json_data_state, selected_fields_state, root_path_selector, status_msg, mapping_table, single_preview, document_count, schema_keys_state],
+        )
+
+        # Re-scan the current upload when the scan mode changes.
+        full_scan.change(
+            fn=load_and_parse_json_with_preview,
+            inputs=[file_input, full_scan],
+            outputs=[json_data_state, selected_fields_state, root_path_selector, status_msg, mapping_table, single_preview, document_count, schema_keys_state],
         )
 
         selected_fields_state.change(
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Sequence
 
-from .paths import split_path
+from .paths import FieldPath, compile_path, split_path
 
 
 def get_value_by_path(data: Any, path: str, sep: str = '.') -> Any:
@@ -10,60 +10,102 @@ def get_value_by_path(data: Any, path: str, sep: str = '.') -> Any:
 
     Handles nested lists by collecting all matching values.
     """
-    keys = split_path(path)
+    if isinstance(path, FieldPath):
+        keys = path.parts
+    elif isinstance(path, str):
+        keys = compile_path(path)
+    else:
+        keys = split_path(path)
+    return get_value_by_keys(data, keys)
+
+
+def _collect_values(container, key):
+    """Collect `key` from every dict found by descending through nested lists.
+
+    Walks an explicit stack of list iterators so nested lists cost no Python
+    frames; values come out in the same depth-first order as recursion.
+    """
+    results = []
+    append = results.append
+    stack = [iter((container,))]
+    while stack:
+        for item in stack[-1]:
+            t = type(item)
+            if t is dict or (t is not list and isinstance(item, dict)):
+                v = item.get(key, None)
+                if v is not None:
+                    append(v)
+            elif t is list or isinstance(item, list):
+                stack.append(iter(item))
+                break
+        else:
+            stack.pop()
+    return results
+
+
+def get_value_by_keys(data: Any, keys: Sequence[str]) -> Any:
+    """Like `get_value_by_path`, but takes an already split path.
+
+    Plain dict chains are walked directly. Lists, missing keys (which may
+    need the dotted-key fallback) and dict subclasses take the full walk.
+    """
     val = data
+    for key in keys:
+        if type(val) is not dict or key not in val:
+            return get_value_by_keys_general(data, keys)
+        val = val[key]
+        if val is None:
+            return None
+    return val
+
 
-    def collect_values(container, key):
-        results = []
-        if isinstance(container, dict):
-            v = container.get(key, None)
-            if v is not None:
-                results.append(v)
-        elif isinstance(container, list):
-            for item in container:
-                results.extend(collect_values(item, key))
-        return results
-
-    try:
-        i = 0
-        while i < len(keys):
-            key = keys[i]
-
-            if isinstance(val, dict):
-                if key in val:
-                    val = val.get(key)
-                    i += 1
-                else:
-                    # Fallback for unescaped dotted dict keys (e.g. 'gpt-3.5-turbo')
-                    # when the incoming path is 'responses.gpt-3.5-turbo.response'.
-                    matched = False
-                    if i + 1 < len(keys):
-                        candidate = key
-                        for j in range(i + 1, len(keys)):
-                            candidate = candidate + '.' + keys[j]
-                            if candidate in val:
-                                val = val.get(candidate)
-                                i = j + 1
-                                matched = True
-                                break
-                    if not matched:
-                        return None
-
-            elif isinstance(val, list):
-                # If we are at a list, we "broadcast" the key access and collect.
-                val = collect_values(val, key)
+def get_value_by_keys_general(data: Any, keys: Sequence[str]) -> Any:
+    """`get_value_by_keys` without its plain-dict fast path.
+
+    Walks keys with list broadcasting and the dotted-key fallback; for callers
+    that already know a plain dict chain misses. Keys are always strings
+    (from split_path/compile_path), so every branch either succeeds or
+    returns None; no exception guard is needed.
+    """
+    val = data
+    i = 0
+    while i < len(keys):
+        key = keys[i]
+        t = type(val)
+
+        if t is dict or (t is not list and isinstance(val, dict)):
+            if key in val:
+                val = val.get(key)
                 i += 1
-                if not val:
-                    return None
             else:
-                return None
+                # Fallback for unescaped dotted dict keys (e.g. 'gpt-3.5-turbo')
+                # when the incoming path is 'responses.gpt-3.5-turbo.response'.
+                matched = False
+                if i + 1 < len(keys):
+                    candidate = key
+                    for j in range(i + 1, len(keys)):
+                        candidate = candidate + '.' + keys[j]
+                        if candidate in val:
+                            val = val.get(candidate)
+                            i = j + 1
+                            matched = True
+                            break
+                if not matched:
+                    return None
 
-            if val is None:
+        elif t is list or isinstance(val, list):
+            # If we are at a list, we "broadcast" the key access and collect.
+            val = _collect_values(val, key)
+            i += 1
+            if not val:
                 return None
+        else:
+            return None
+
+        if val is None:
+            return None
 
-        return val
-    except Exception:
-        return None
+    return val
 
 
 def set_value_by_path(data: Any, path: str, value: Any, sep: str = '.'):
@@ -74,7 +116,7 @@ def set_value_by_path(data: Any, path: str, value: Any, sep: str = '.'):
     if not isinstance(data, dict):
         return value
 
-    parts = split_path(path)
+    parts = compile_path(path) if isinstance(path, str) else split_path(path)
     current = data
     for part in parts[:-1]:
         nxt = current.get(part)
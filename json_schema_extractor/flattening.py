@@ -1,43 +1,220 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict, List
+from functools import lru_cache
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
-from .records import resolve_field_value, resolve_groups_for_merge
+from .accessors import get_value_by_keys, get_value_by_keys_general
+from .paths import parse_field_path
+from .records import iter_root_records, resolve_groups_cached
 
 
-def flatten_data_for_export(
+_LIST_SEP = ", "
+
+
+def _format_list(val: List[Any]) -> str:
+    """Join a list of scalars with ', ', or JSON-encode it if anything is nested.
+
+    The type check and string conversion share one pass over the list. Lists
+    of strings, the usual case, are joined directly in C.
+    """
+    if val and type(val[0]) is str and None not in val:
+        try:
+            return _LIST_SEP.join(val)
+        except TypeError:
+            pass  # a non-string further in; take the general pass
+    parts: List[str] = []
+    append = parts.append
+    for v in val:
+        t = type(v)
+        if t is str:
+            append(v)
+        elif v is None:
+            append("")
+        elif t is int or t is float or t is bool or isinstance(v, (str, int, float)):
+            append(str(v))
+        else:
+            try:
+                return json.dumps(val, ensure_ascii=False)
+            except TypeError:
+                return str(val)
+    return _LIST_SEP.join(parts)
+
+
+def _format_value(val: Any) -> Any:
+    if isinstance(val, list):
+        return _format_list(val)
+    return val
+
+
+def _compile_fields(
     data: Any,
     selected_fields: List[str],
     mapping: Dict[str, str],
-    root_path: str = '(root)',
-) -> List[Dict[str, Any]]:
-    """Flatten data into list[dict] for export."""
-    rows: List[Dict[str, Any]] = []
+    root_path: str,
+) -> List[Tuple[str, Optional[Sequence[str]], Any]]:
+    """Resolve each field once into `(out_name, record_keys, constant)`.
+
+    Fields under the root are read from each record via `record_keys` (an
+    empty tuple selects the record itself). Fields outside the root don't
+    depend on the record, so they are resolved and formatted once up front
+    and `record_keys` is None.
+    """
+    compiled: List[Tuple[str, Optional[Sequence[str]], Any]] = []
+    root = None if root_path in (None, '', '(root)') else parse_field_path(root_path)
+    for field in selected_fields:
+        out_name = mapping.get(field, field)
+        path = parse_field_path(field)
+        if root is None:
+            compiled.append((out_name, path.parts, None))
+        elif path.parts == root.parts:
+            compiled.append((out_name, (), None))
+        elif path.is_under(root):
+            compiled.append((out_name, path.relative_to(root), None))
+        else:
+            compiled.append((out_name, None, _format_value(get_value_by_keys(data, path.parts))))
+    return compiled
+
+
+def _crosses_list(record: Any, keys: Sequence[str]) -> bool:
+    """Return True if walking keys through record runs into a list."""
+    val = record
+    for key in keys:
+        t = type(val)
+        if t is list or (t is not dict and isinstance(val, list)):
+            return True
+        if t is not dict and not isinstance(val, dict):
+            return False
+        val = val.get(key)
+    return False
+
+
+@lru_cache(maxsize=32)
+def _build_projector(spec: Tuple[Tuple[Any, Optional[Tuple[str, ...]], bool], ...], as_tuple: bool = False):
+    """Generate a straight-line `project(record, constants)` for one field spec.
+
+    Each spec entry is `(out_name, record_keys, broadcast)`. Single-segment
+    lookups become `record.get(key)`; deeper ones are emitted as chained
+    subscripts and fall back to the general key walk when the chain misses,
+    so list broadcasts and dotted-key fallbacks behave exactly as in the
+    generic accessor. Entries flagged `broadcast` use `get_value_by_keys`.
+    The row is returned as one dict display over the fixed output names,
+    which CPython builds in a single BUILD_MAP (faster than dict(zip(...))).
+    With `as_tuple` it is a tuple aligned to the output names instead; a
+    repeated name takes the value of its last field, as in the dict row.
+    Names and keys are bound in the namespace, never formatted into source.
+    """
+    namespace: Dict[str, Any] = {'_get': get_value_by_keys, '_walk': get_value_by_keys_general, '_fmt': _format_list}
+    lines = ['def project(record, constants):']
+    items = []
+    const_idx = 0
+    for i, (out_name, keys, broadcast) in enumerate(spec):
+        namespace[f'N{i}'] = out_name
+        items.append(f'N{i}: v{i}')
+        if keys is None:
+            lines.append(f'    v{i} = constants[{const_idx}]')
+            const_idx += 1
+            continue
+        if not keys:
+            lines.append(f'    v{i} = record')
+        elif broadcast:
+            namespace[f'K{i}'] = keys
+            lines.append(f'    v{i} = _get(record, K{i})')
+        elif len(keys) == 1:
+            # Records are always dicts and a single segment has no dotted-key
+            # fallback, so dict.get is exactly the generic lookup.
+            namespace[f'K{i}_0'] = keys[0]
+            lines.append(f'    v{i} = record.get(K{i}_0)')
+        else:
+            namespace[f'K{i}'] = keys
+            subscripts = ''.join(f'[K{i}_{j}]' for j in range(len(keys)))
+            for j, key in enumerate(keys):
+                namespace[f'K{i}_{j}'] = key
+            lines.append('    try:')
+            lines.append(f'        v{i} = record{subscripts}')
+            lines.append('    except (KeyError, TypeError, IndexError):')
+            # The subscript chain already missed, so skip the plain-dict pass.
+            lines.append(f'        v{i} = _walk(record, K{i})')
+        lines.append(f'    if isinstance(v{i}, list):')
+        lines.append(f'        v{i} = _fmt(v{i})')
+    if as_tuple:
+        last = {out_name: i for i, (out_name, _, _) in enumerate(spec)}
+        values = [f'v{last[out_name]}' for out_name, _, _ in spec]
+        lines.append('    return (' + ''.join(f'{v}, ' for v in values) + ')')
+    else:
+        lines.append('    return {' + ', '.join(items) + '}')
+    exec('\n'.join(lines), namespace)
+    return namespace['project']
+
+
+def _make_projector(
+    data: Any,
+    selected_fields: List[str],
+    mapping: Dict[str, str],
+    root_path: str,
+    sample: Any,
+    as_tuple: bool = False,
+) -> Callable[[Any], Any]:
+    """Compile the selected fields into a single-argument row projector.
+
+    `sample` (usually the first record) decides which lookups take the
+    list-broadcast path up front; a wrong guess only costs a fallback call.
+    """
+    compiled = _compile_fields(data, selected_fields, mapping, root_path)
+    spec = tuple(
+        (out_name, None if keys is None else tuple(keys), keys is not None and _crosses_list(sample, keys))
+        for out_name, keys, _ in compiled
+    )
+    constants = tuple(constant for _, keys, constant in compiled if keys is None)
+    project = _build_projector(spec, as_tuple)
+    return lambda record: project(record, constants)
+
 
+def _iter_projected(data, records, selected_fields, mapping, root_path, as_tuple):
+    first = next(records, None)
+    if first is None:
+        return
+    project = _make_projector(data, selected_fields, mapping, root_path, first, as_tuple)
+    yield project(first)
+    yield from map(project, records)
+
+
+def iter_export_rows(
+    data: Any,
+    selected_fields: List[str],
+    mapping: Dict[str, str],
+    root_path: str = '(root)',
+) -> Iterator[Dict[str, Any]]:
+    """Yield flattened export rows one at a time."""
     # Iterate records (not groups) even for list[list[dict]] roots.
-    groups, _ = resolve_groups_for_merge(data, root_path)
-    records = [rec for group in groups for rec in group]
+    groups, _ = resolve_groups_cached(data, root_path)
+    return _iter_projected(data, chain.from_iterable(groups), selected_fields, mapping, root_path, False)
 
-    for record in records:
-        row: Dict[str, Any] = {}
-        for field in selected_fields:
-            val = resolve_field_value(data, record, field, root_path)
 
-            if isinstance(val, list):
-                if all(isinstance(v, (str, int, float, bool)) or v is None for v in val):
-                    val = ", ".join(["" if v is None else str(v) for v in val])
-                else:
-                    try:
-                        val = json.dumps(val, ensure_ascii=False)
-                    except TypeError:
-                        val = str(val)
+def iter_export_tuples(
+    data: Any,
+    selected_fields: List[str],
+    mapping: Dict[str, str],
+    root_path: str = '(root)',
+) -> Iterator[Tuple[Any, ...]]:
+    """Yield export rows as tuples aligned to `[mapping.get(f, f) for f in selected_fields]`.
+
+    Same values as `iter_export_rows` without building a dict per row, for
+    writers that only need positions (CSV).
+    """
+    groups, _ = resolve_groups_cached(data, root_path)
+    return _iter_projected(data, chain.from_iterable(groups), selected_fields, mapping, root_path, True)
 
-            out_name = mapping.get(field, field)
-            row[out_name] = val
-        rows.append(row)
 
-    return rows
+def flatten_data_for_export(
+    data: Any,
+    selected_fields: List[str],
+    mapping: Dict[str, str],
+    root_path: str = '(root)',
+) -> List[Dict[str, Any]]:
+    """Flatten data into list[dict] for export."""
+    return list(iter_export_rows(data, selected_fields, mapping, root_path))
 
 
 def flatten_data_for_preview(
@@ -50,24 +227,7 @@ def flatten_data_for_preview(
     if data is None or not selected_fields:
         return []
 
-    rows: List[Dict[str, Any]] = []
-    groups, _ = resolve_groups_for_merge(data, root_path)
-    for group in groups:
-        for record in group:
-            row: Dict[str, Any] = {}
-            for field in selected_fields:
-                val = resolve_field_value(data, record, field, root_path)
-                if isinstance(val, list):
-                    if all(isinstance(v, (str, int, float, bool)) or v is None for v in val):
-                        val = ", ".join(["" if v is None else str(v) for v in val])
-                    else:
-                        try:
-                            val = json.dumps(val, ensure_ascii=False)
-                        except TypeError:
-                            val = str(val)
-                out_name = mapping.get(field, field)
-                row[out_name] = val
-            rows.append(row)
-            if len(rows) >= max(1, int(limit)):
-                return rows
-    return rows
+    # Stop after `limit` records instead of resolving every group first.
+    records = iter_root_records(data, root_path)
+    rows = _iter_projected(data, records, selected_fields, mapping, root_path, False)
+    return list(islice(rows, max(1, int(limit))))
@@ -3,16 +3,18 @@ from __future__ import annotations
 import json
 import os
 import tempfile
-from copy import deepcopy
+from collections import defaultdict
+from itertools import chain, islice
 from typing import Any, Dict, List
 from uuid import uuid4
 
 import gradio as gr
 
-from .accessors import get_value_by_path
+from .accessors import get_value_by_keys
 from .accessors import set_value_by_path
-from .io_utils import read_json_content
-from .records import extract_record_keys, resolve_groups_for_merge
+from .io_utils import read_json_content, write_json
+from .paths import compile_path, parse_field_path
+from .records import clear_groups_cache, extract_record_keys, resolve_groups_for_merge
 from .schema_utils import find_list_paths
 
 
@@ -45,21 +47,40 @@ def normalize_key_component(value):
     return value
 
 
-def build_join_key_tuple(item, join_paths):
-    return tuple(normalize_key_component(get_value_by_path(item, path)) for path in join_paths)
+def _make_join_key_builder(join_paths):
+    """Return `item -> join key`, specialized for one and two join fields.
+
+    A single field keys the index by its normalized value instead of a
+    1-tuple; both merge sides use the same builder, so keys stay comparable.
+    """
+    parts = [path.parts for path in join_paths]
+    norm = normalize_key_component
+    get = get_value_by_keys
+    if len(parts) == 1:
+        only = parts[0]
+        return lambda item: norm(get(item, only))
+    if len(parts) == 2:
+        first, second = parts
+        return lambda item: (norm(get(item, first)), norm(get(item, second)))
+    return lambda item: tuple(norm(get(item, p)) for p in parts)
 
 
 def build_merged_record(primary_record, secondary_record):
+    """Overlay secondary fields onto a shallow copy of the primary record.
+
+    Only the top level is copied; nested values are shared with the inputs.
+    Merged records are serialized straight away and never mutated.
+    """
     merged: Dict[str, Any] = {}
     if primary_record is not None and isinstance(primary_record, dict):
-        merged = deepcopy(primary_record)
+        merged = dict(primary_record)
     elif secondary_record is not None and isinstance(secondary_record, dict):
-        merged = deepcopy(secondary_record)
+        merged = dict(secondary_record)
 
     if secondary_record is not None and isinstance(secondary_record, dict):
         for key, value in secondary_record.items():
             if key not in merged or merged.get(key) is None:
-                merged[key] = deepcopy(value)
+                merged[key] = value
 
     return merged
 
@@ -74,21 +95,35 @@ def perform_dataset_merge(primary_data, secondary_data, primary_root, secondary_
     join_keys = [k for k in join_keys if k]
     if not join_keys:
         raise ValueError("Select valid join keys.")
+    # Parse the join paths once instead of per record on both sides.
+    build_key = _make_join_key_builder([parse_field_path(k) for k in join_keys])
 
+    # Each side is resolved once per merge; going around the shared cache
+    # keeps both documents from being pinned after the merge is written.
     primary_groups, primary_grouped = resolve_groups_for_merge(primary_data, primary_root)
     secondary_groups, _ = resolve_groups_for_merge(secondary_data, secondary_root)
-    primary_records = [rec for group in primary_groups for rec in group]
-    secondary_records = [rec for group in secondary_groups for rec in group]
+    primary_total = sum(map(len, primary_groups))
+    # A list[dict] root resolves to a single group; read it in place.
+    if len(secondary_groups) == 1:
+        secondary_records = secondary_groups[0]
+    else:
+        secondary_records = list(chain.from_iterable(secondary_groups))
 
-    if not primary_records:
+    if not primary_total:
         raise ValueError("Primary dataset has no iterable items for the selected root path.")
     if not secondary_records:
         raise ValueError("Secondary dataset has no iterable items for the selected root path.")
 
-    secondary_index = {}
-    for idx, item in enumerate(secondary_records):
-        key = build_join_key_tuple(item, join_keys)
-        secondary_index.setdefault(key, []).append(idx)
+    secondary_keys = list(map(build_key, secondary_records))
+    # Join keys are usually unique on the secondary side; then one C-level
+    # dict(zip(...)) maps each key straight to its row. Duplicates fall back
+    # to a key -> [rows] multimap.
+    secondary_index = dict(zip(secondary_keys, range(len(secondary_keys))))
+    unique_keys = len(secondary_index) == len(secondary_keys)
+    if not unique_keys:
+        secondary_index = defaultdict(list)
+        for idx, key in enumerate(secondary_keys):
+            secondary_index[key].append(idx)
 
     merged_rows: List[Dict[str, Any]] = []
     merged_groups: List[List[Dict[str, Any]]] = [[] for _ in range(len(primary_groups))] if primary_grouped else []
@@ -97,23 +132,23 @@ def perform_dataset_merge(primary_data, secondary_data, primary_root, secondary_
     primary_only = 0
 
     for group_idx, group in enumerate(primary_groups):
+        out = merged_groups[group_idx] if primary_grouped else merged_rows
         for item in group:
-            key = build_join_key_tuple(item, join_keys)
-            matches = secondary_index.get(key, [])
-            if matches:
-                for idx in matches:
-                    merged = build_merged_record(item, secondary_records[idx])
-                    if primary_grouped:
-                        merged_groups[group_idx].append(merged)
-                    else:
-                        merged_rows.append(merged)
+            found = secondary_index.get(build_key(item))
+            if found is None:
+                primary_only += 1
+            elif unique_keys:
+                out.append(build_merged_record(item, secondary_records[found]))
+                matched_secondary.add(found)
+                match_pairs += 1
+            else:
+                for idx in found:
+                    out.append(build_merged_record(item, secondary_records[idx]))
                     matched_secondary.add(idx)
                     match_pairs += 1
-            else:
-                primary_only += 1
 
     stats = {
-        'primary_total': len(primary_records),
+        'primary_total': primary_total,
         'secondary_total': len(secondary_records),
         'match_pairs': match_pairs,
         'primary_only': primary_only,
@@ -128,7 +163,16 @@ def build_merged_output_container(primary_data, primary_root, merged_items):
         return merged_items
 
     if isinstance(primary_data, dict):
-        output = deepcopy(primary_data)
+        # Only the dicts along the root path are written to, so copy just that
+        # spine and share everything else with the (unmodified) input.
+        output = dict(primary_data)
+        current = output
+        for part in compile_path(primary_root)[:-1]:
+            nxt = current.get(part)
+            if not isinstance(nxt, dict):
+                break
+            nxt = current[part] = dict(nxt)
+            current = nxt
         return set_value_by_path(output, primary_root, merged_items)
 
     return merged_items
@@ -163,13 +207,12 @@ def merge_datasets_handler(primary_data, secondary_data, primary_root, secondary
     path = os.path.join(temp_dir, output_name)
 
     try:
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(merged_output, f, indent=2)
+        write_json(merged_output, path)
     except Exception as exc:
         return None, f"Error writing merged file: {str(exc)}", None
 
     if isinstance(merged_payload, list) and merged_payload and isinstance(merged_payload[0], list):
-        flat_preview = [rec for group in merged_payload for rec in group][:3]
+        flat_preview = list(islice(chain.from_iterable(merged_payload), 3))
     elif isinstance(merged_payload, list):
         flat_preview = merged_payload[:3]
     else:
@@ -188,6 +231,8 @@ def handle_merge_dataset_upload(file_obj, other_keys, current_selection, label_p
     if file_obj is None:
         return None, [], gr.update(choices=["(root)"], value="(root)"), f"{label_prefix}: No file uploaded.", gr.update(choices=[], value=[], interactive=False)
 
+    # Release groups cached for previously loaded documents.
+    clear_groups_cache()
     try:
         data = read_json_content(file_obj)
     except Exception as e:
@@ -199,7 +244,9 @@ def handle_merge_dataset_upload(file_obj, other_keys, current_selection, label_p
     default_root = "(root)" if "(root)" in list_paths else list_paths[0]
     root_dropdown = gr.update(choices=list_paths, value=default_root)
 
-    keys = extract_record_keys(data, default_root)
+    # Record keys are only intersected for the join-key picker, which sorts
+    # the result itself.
+    keys = extract_record_keys(data, default_root, ordered=False)
     status_message = f"{label_prefix}: Successfully loaded. Found {len(keys)} record fields."
     join_update = update_join_key_dropdown(keys, other_keys, current_selection)
     return data, keys, root_dropdown, status_message, join_update
@@ -216,10 +263,10 @@ def handle_secondary_dataset_upload(file_obj, primary_keys, current_selection):
 
 
 def handle_primary_root_change(primary_data, primary_root, secondary_keys, current_selection):
-    keys = extract_record_keys(primary_data, primary_root)
+    keys = extract_record_keys(primary_data, primary_root, ordered=False)
     return keys, update_join_key_dropdown(keys, secondary_keys, current_selection)
 
 
 def handle_secondary_root_change(secondary_data, secondary_root, primary_keys, current_selection):
-    keys = extract_record_keys(secondary_data, secondary_root)
+    keys = extract_record_keys(secondary_data, secondary_root, ordered=False)
     return keys, update_join_key_dropdown(primary_keys, keys, current_selection)
@@ -1,31 +1,39 @@
 from __future__ import annotations
 
 import csv
-import json
 import os
 import tempfile
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
 
 import gradio as gr
 
-from .flattening import flatten_data_for_export, flatten_data_for_preview
-from .io_utils import read_json_content
-from .paths import split_path
-from .records import resolve_groups_for_merge
-from .schema_utils import extract_all_keys, find_list_paths
+from .flattening import flatten_data_for_preview, iter_export_rows, iter_export_tuples
+from .io_utils import LazyJSONDocument, materialize, read_json_content, scan_json_schema, should_stream, write_json_rows
+from .paths import compile_path
+from .records import clear_groups_cache, resolve_groups_cached
+from .schema_utils import scan_schema
 
 
-def prepare_dataset_payload(file_obj):
+def prepare_dataset_payload(file_obj, strict_schema: bool = False):
     if file_obj is None:
         return None, [], gr.update(choices=[]), "No file uploaded."
 
+    clear_groups_cache()
     try:
-        data = read_json_content(file_obj)
+        # Large upload: discover the schema in one streaming pass and defer
+        # building the full tree until preview/export needs it. Documents
+        # ijson can't read fall back to the eager parse below.
+        data = scan_json_schema(file_obj) if should_stream(file_obj) else None
+        if data is not None:
+            list_paths = data.list_paths
+            all_keys = sorted(data.keys)
+        else:
+            data = read_json_content(file_obj)
+            scanned_keys, list_paths = scan_schema(data, strict_schema=strict_schema)
+            all_keys = sorted(scanned_keys)
     except Exception as e:
         return None, [], gr.update(choices=[]), f"Error parsing JSON: {str(e)}"
 
-    all_keys = sorted(list(extract_all_keys(data)))
-    list_paths = find_list_paths(data)
     if not list_paths:
         list_paths = ["(root)"]
 
@@ -33,49 +41,83 @@ def prepare_dataset_payload(file_obj):
     return data, all_keys, gr.update(choices=list_paths, value=default_root), f"Successfully loaded. Found {len(all_keys)} unique fields."
 
 
-def load_and_parse_json(file_obj):
-    data, _, root_dropdown, message = prepare_dataset_payload(file_obj)
+def load_and_parse_json(file_obj, strict_schema: bool = False):
+    data, _, root_dropdown, message = prepare_dataset_payload(file_obj, strict_schema)
     if data is None:
-        return None, [], root_dropdown, message
-    return data, [], root_dropdown, message
+        return None, {}, root_dropdown, message
+    return data, {}, root_dropdown, message
+
+
+def _format_document_count(record_count: int, group_count: int, grouped: bool) -> str:
+    if grouped:
+        return f"Documents: {record_count} (groups: {group_count})"
+    return f"Documents: {record_count}"
 
 
 def compute_document_count_text(data: Any, root_path: str = '(root)') -> str:
     if data is None:
         return ""
+    root_path = root_path or '(root)'
+    if isinstance(data, LazyJSONDocument) and not data.loaded:
+        # Use the counts from the streaming scan; parsing a large upload just
+        # to count it would defeat deferring the parse.
+        counts = (data.root_counts or {}).get(root_path)
+        if counts is None:
+            return "Documents: counted once the file is loaded for preview or export"
+        return _format_document_count(*counts)
     try:
-        groups, grouped = resolve_groups_for_merge(data, root_path or '(root)')
-        record_count = sum(len(g) for g in groups)
-        if grouped:
-            return f"Documents: {record_count} (groups: {len(groups)})"
-        return f"Documents: {record_count}"
+        groups, grouped = resolve_groups_cached(materialize(data), root_path)
+        return _format_document_count(sum(len(g) for g in groups), len(groups), grouped)
     except Exception:
         return ""
 
 
-def load_and_parse_json_with_preview(file_obj):
-    data, _, root_dropdown, message = prepare_dataset_payload(file_obj)
+def load_and_parse_json_with_preview(file_obj, strict_schema: bool = False):
+    data, all_keys, root_dropdown, message = prepare_dataset_payload(file_obj, strict_schema)
     if data is None:
-        return None, [], root_dropdown, message, [], None, ""
+        return None, {}, root_dropdown, message, [], None, "", []
 
     count_text = compute_document_count_text(
         data,
         root_dropdown.get("value") if isinstance(root_dropdown, dict) else "(root)",
     )
-    return data, [], root_dropdown, message, [], None, count_text
+    return data, {}, root_dropdown, message, [], None, count_text, all_keys
 
 
 def handle_root_change_single_dataset(data: Any, root_path: str, mapping_df):
     return compute_document_count_text(data, root_path or '(root)'), None
 
 
+def default_output_name(path: str) -> str:
+    parts = compile_path(path)
+    return parts[-1] if parts else (path or "")
+
+
+def set_selected_fields(chosen, current_selected) -> Dict[str, str]:
+    """Return the selection for the checked fields of the field picker.
+
+    The selection maps each field to its default output name in the order the
+    fields were first checked: fields that stay checked keep their position
+    and newly checked ones are appended.
+    """
+    if isinstance(current_selected, dict):
+        current = current_selected
+    else:
+        current = {f: default_output_name(f) for f in (current_selected or [])}
+    chosen = list(chosen or [])
+    keep = set(chosen)
+    selected = {f: name for f, name in current.items() if f in keep}
+    for f in chosen:
+        if f not in selected:
+            selected[f] = default_output_name(f)
+    return selected
+
+
 def update_mapping_table(selected_fields):
     if not selected_fields:
         return []
-    def default_output_name(path: str) -> str:
-        parts = split_path(path)
-        return parts[-1] if parts else (path or "")
-
+    if isinstance(selected_fields, dict):
+        return [[f, name] for f, name in selected_fields.items()]
     return [[f, default_output_name(f)] for f in selected_fields]
 
 
@@ -89,32 +131,50 @@ def update_mapping_table_and_preview(selected_fields, data, root_path):
         return table, None
     mapping = {row[0]: row[1] for row in table}
     fields = [row[0] for row in table]
-    preview_rows = flatten_data_for_preview(data, fields, mapping, root_path or '(root)', limit=3)
+    preview_rows = flatten_data_for_preview(materialize(data), fields, mapping, root_path or '(root)', limit=3)
     return table, preview_rows if preview_rows else None
 
 
+def _normalize_mapping(mapping_df) -> Tuple[List[str], Dict[str, str]]:
+    """Return `(selected_fields, mapping)` from a mapping DataFrame or list of rows."""
+    if hasattr(mapping_df, 'columns'):
+        selected_fields = mapping_df["Input Path"].tolist()
+        output_names = mapping_df["Output Name"].tolist()
+    else:
+        selected_fields = [row[0] for row in mapping_df]
+        output_names = [row[1] for row in mapping_df]
+    return selected_fields, dict(zip(selected_fields, output_names))
+
+
+def _write_csv_rows(rows, headers: List[str], path: str) -> None:
+    """Stream header-aligned row tuples to CSV.
+
+    csv.writer renders values exactly as csv.DictWriter did (None as '').
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+
 def export_data_handler(data, mapping_df, output_format, file_name, root_path=None):
     if data is None:
         return None, "No data loaded."
 
-    if mapping_df is None or mapping_df.empty:
+    if mapping_df is None:
         return None, "No fields selected."
 
     if root_path is None:
         root_path = "(root)"
 
     try:
-        mapping = dict(zip(mapping_df["Input Path"], mapping_df["Output Name"]))
-        selected_fields = mapping_df["Input Path"].tolist()
-    except Exception:
-        mapping = {row[0]: row[1] for row in mapping_df}
-        selected_fields = [row[0] for row in mapping_df]
+        selected_fields, mapping = _normalize_mapping(mapping_df)
+    except (KeyError, IndexError, TypeError):
+        return None, "No fields selected."
 
     if not selected_fields:
         return None, "No fields selected."
 
-    processed_rows = flatten_data_for_export(data, selected_fields, mapping, root_path)
-
     if not file_name or not file_name.strip():
         file_name = "output"
 
@@ -126,16 +186,12 @@ def export_data_handler(data, mapping_df, output_format, file_name, root_path=No
     path = os.path.join(temp_dir, file_name)
 
     try:
+        data = materialize(data)
         if output_format == "CSV":
             headers = [mapping.get(f, f) for f in selected_fields]
-            with open(path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=headers)
-                writer.writeheader()
-                if processed_rows:
-                    writer.writerows(processed_rows)
+            _write_csv_rows(iter_export_tuples(data, selected_fields, mapping, root_path), headers, path)
         else:
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(processed_rows, f, indent=2)
+            write_json_rows(iter_export_rows(data, selected_fields, mapping, root_path), path)
 
         return path, f"Export successful! Saved to {path}"
     except Exception as e:
@@ -149,17 +205,12 @@ def preview_single_dataset_handler(data, mapping_df, root_path=None):
         root_path = "(root)"
 
     try:
-        mapping = dict(zip(mapping_df["Input Path"], mapping_df["Output Name"]))
-        selected_fields = mapping_df["Input Path"].tolist()
-    except Exception:
-        try:
-            mapping = {row[0]: row[1] for row in mapping_df}
-            selected_fields = [row[0] for row in mapping_df]
-        except Exception:
-            return None
+        selected_fields, mapping = _normalize_mapping(mapping_df)
+    except (KeyError, IndexError, TypeError):
+        return None
 
     if not selected_fields:
         return None
 
-    preview_rows = flatten_data_for_preview(data, selected_fields, mapping, root_path, limit=3)
+    preview_rows = flatten_data_for_preview(materialize(data), selected_fields, mapping, root_path, limit=3)
     return preview_rows if preview_rows else None
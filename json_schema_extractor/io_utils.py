@@ -1,6 +1,106 @@
 from __future__ import annotations
 
 import json
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .paths import escape_path_segment
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional, enables streaming schema discovery
+    ijson = None
+
+# Uploads larger than this are scanned with ijson and only parsed on demand.
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+
+
+def _loads(content):
+    """Parse JSON text or bytes, preferring orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # orjson is stricter than the stdlib (NaN/Infinity, huge ints);
+            # retry so those documents keep loading as before.
+            pass
+    if isinstance(content, (bytes, bytearray)):
+        content = content.decode('utf-8')
+    return json.loads(content)
+
+
+def _replace_non_finite(obj: Any) -> Any:
+    """Return obj with NaN/Infinity floats replaced by None, recursively."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _replace_non_finite(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_replace_non_finite(v) for v in obj]
+    return obj
+
+
+def _encode_indented_stdlib(obj: Any) -> bytes:
+    """Encode obj like orjson's OPT_INDENT_2 does: raw UTF-8, non-finite floats as null."""
+    try:
+        text = json.dumps(obj, indent=2, ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        # NaN/Infinity; orjson writes these as null, so do the same.
+        return _encode_indented_stdlib(_replace_non_finite(obj))
+    try:
+        return text.encode('utf-8')
+    except UnicodeEncodeError:
+        # Lone surrogates have no UTF-8 form; keep them as \u escapes.
+        return json.dumps(obj, indent=2).encode('utf-8')
+
+
+def _encode_indented(obj: Any) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # e.g. ints beyond 64 bits; let the stdlib encoder handle them.
+            pass
+    return _encode_indented_stdlib(obj)
+
+
+def write_json(obj: Any, path: str) -> None:
+    """Write obj to path as indented JSON, encoding with orjson when available.
+
+    Both encoders write UTF-8 text unescaped and NaN/Infinity as null, so the
+    output is the same whichever one handles a value.
+    """
+    with open(path, 'wb') as f:
+        f.write(_encode_indented(obj))
+
+
+def write_json_rows(rows: Iterable[Any], path: str) -> None:
+    """Stream rows to path as an indented JSON array without building the list.
+
+    Produces the same layout as `write_json(list(rows), path)`: each row is
+    encoded on its own and shifted one level in. Encoded JSON never contains
+    raw newlines inside strings, so re-indenting on b'\n' is safe.
+    """
+    with open(path, 'wb') as f:
+        first = True
+        for row in rows:
+            f.write(b'[\n  ' if first else b',\n  ')
+            f.write(_encode_indented(row).replace(b'\n', b'\n  '))
+            first = False
+        f.write(b'[]' if first else b'\n]')
+
+
+def _upload_path(file_obj) -> Optional[str]:
+    if file_obj is None or hasattr(file_obj, 'read'):
+        return None
+    path = file_obj.name if hasattr(file_obj, 'name') else file_obj
+    return path if isinstance(path, (str, os.PathLike)) else None
 
 
 def read_json_content(file_obj):
@@ -11,11 +111,153 @@ def read_json_content(file_obj):
     if hasattr(file_obj, 'read'):
         if hasattr(file_obj, 'seek'):
             file_obj.seek(0)
-        content = file_obj.read()
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
-        return json.loads(content)
+        return _loads(file_obj.read())
 
-    path = file_obj.name if hasattr(file_obj, 'name') else file_obj
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    path = _upload_path(file_obj)
+    with open(path, 'rb') as f:
+        return _loads(f.read())
+
+
+def _schema_from_events(
+    events: Iterable[Tuple[str, str, Any]],
+) -> Tuple[Set[str], List[str], Dict[str, Tuple[int, int, bool]]]:
+    """Build `(all_keys, list_paths, root_counts)` from ijson-style `(prefix, event, value)` tuples.
+
+    Produces the same results as `extract_all_keys(data, strict_schema=True)`
+    and `find_list_paths` on the parsed document, holding only the current
+    path stack in memory. ijson prefixes are not escaped, so paths are
+    tracked from `map_key` events. `root_counts` maps '(root)' and every
+    list path reached through dicts alone (which includes the default root
+    the UI picks) to `(records, groups, grouped)` as
+    `resolve_groups_for_merge` would report for that root.
+    """
+    keys: Set[str] = set()
+    list_paths: List[str] = []
+    # Frames are [is_map, path, visible, has_child, chain, tally]. `visible`
+    # mirrors which containers find_list_paths descends into (dicts, and a
+    # list's first dict); `chain` marks containers reached through dicts
+    # only. A chain list's tally counts its [dicts, lists, dicts in those
+    # lists]; a list directly inside it shares that tally for the last slot.
+    stack: List[list] = []
+    pending_key = ''
+    tallies: Dict[str, List[int]] = {}
+    root_is_map = False
+
+    for _, event, value in events:
+        if event == 'map_key':
+            pending_key = value
+            continue
+        if event == 'end_map' or event == 'end_array':
+            stack.pop()
+            continue
+
+        if not stack:
+            path, in_map, visible, chain, parent = '', False, True, True, None
+        else:
+            parent = stack[-1]
+            in_map = parent[0]
+            chain = in_map and parent[4]
+            if in_map:
+                escaped = escape_path_segment(pending_key)
+                path = f"{parent[1]}.{escaped}" if parent[1] else escaped
+                visible = parent[2]
+            else:
+                path = parent[1]
+                visible = parent[2] and not parent[3]
+                parent[3] = True
+
+        if event == 'start_map':
+            if parent is None:
+                root_is_map = True
+            elif not in_map and parent[5] is not None:
+                parent[5][0 if parent[4] else 2] += 1
+            stack.append([True, path, visible, False, chain, None])
+        elif event == 'start_array':
+            if parent is None:
+                list_paths.append("(root)")
+            elif in_map and visible:
+                list_paths.append(path)
+            else:
+                visible = False
+            tally = None
+            if chain:
+                # A repeated key keeps its last value, as json.loads does.
+                tally = tallies[path or "(root)"] = [0, 0, 0]
+            elif not in_map and parent[4]:
+                parent[5][1] += 1
+                tally = parent[5]
+            stack.append([False, path, visible, False, chain, tally])
+        elif in_map or path:
+            keys.add(path)
+
+    list_paths.sort()
+    root_counts: Dict[str, Tuple[int, int, bool]] = {}
+    for root_path, (dicts, lists, inner) in tallies.items():
+        if lists:
+            root_counts[root_path] = (dicts + inner, dicts + lists, True)
+        else:
+            root_counts[root_path] = (dicts, 1 if dicts else 0, False)
+    if "(root)" not in root_counts:
+        # A single-record or scalar document.
+        root_counts["(root)"] = (1, 1, False) if root_is_map else (0, 0, False)
+    return keys, list_paths, root_counts
+
+
+def should_stream(file_obj) -> bool:
+    """Return True when the upload is large enough to scan with ijson."""
+    if ijson is None:
+        return False
+    path = _upload_path(file_obj)
+    try:
+        return path is not None and os.path.getsize(path) > STREAMING_THRESHOLD_BYTES
+    except OSError:
+        return False
+
+
+def scan_json_schema(file_obj) -> Optional["LazyJSONDocument"]:
+    """Stream an uploaded file once and return it as a scanned LazyJSONDocument.
+
+    Returns None when ijson rejects the document, e.g. for NaN/Infinity
+    literals, which the eager loader accepts.
+    """
+    try:
+        with open(_upload_path(file_obj), 'rb') as f:
+            keys, list_paths, root_counts = _schema_from_events(ijson.parse(f))
+    except ijson.JSONError:
+        return None
+    return LazyJSONDocument(file_obj, keys, list_paths, root_counts)
+
+
+class LazyJSONDocument:
+    """An upload whose schema is known but whose tree is parsed on first use.
+
+    The scan results travel with the document: `keys`, `list_paths` and
+    `root_counts` as from `_schema_from_events`.
+    """
+
+    def __init__(
+        self,
+        file_obj,
+        keys: Optional[Set[str]] = None,
+        list_paths: Optional[List[str]] = None,
+        root_counts: Optional[Dict[str, Tuple[int, int, bool]]] = None,
+    ):
+        self.path = _upload_path(file_obj)
+        self.keys = keys
+        self.list_paths = list_paths
+        self.root_counts = root_counts
+        self._data = None
+        self.loaded = False
+
+    def load(self):
+        if not self.loaded:
+            self._data = read_json_content(self.path)
+            self.loaded = True
+        return self._data
+
+
+def materialize(data):
+    """Return the parsed tree for data, loading a LazyJSONDocument if needed."""
+    if isinstance(data, LazyJSONDocument):
+        return data.load()
+    return data
@@ -1,6 +1,14 @@
 from __future__ import annotations
 
-from typing import List
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+# Keys repeat across records, so escaped forms are memoized per raw key.
+# A plain dict is cheaper than lru_cache here; it is reset when it grows large.
+_ESC_CACHE: Dict[str, str] = {}
+_ESC_CACHE_MAX = 1_000_000
 
 
 def escape_path_segment(segment: str) -> str:
@@ -11,12 +19,19 @@ def escape_path_segment(segment: str) -> str:
     """
     if not isinstance(segment, str):
         segment = str(segment)
-    return segment.replace('\\', '\\\\').replace('.', '\\.')
+    escaped = _ESC_CACHE.get(segment)
+    if escaped is None:
+        if len(_ESC_CACHE) >= _ESC_CACHE_MAX:
+            _ESC_CACHE.clear()
+        escaped = _ESC_CACHE[segment] = segment.replace('\\', '\\\\').replace('.', '\\.')
+    return escaped
 
 
 def unescape_path_segment(segment: str) -> str:
     if segment is None:
         return ''
+    if '\\' not in segment:
+        return segment
     out: List[str] = []
     i = 0
     while i < len(segment):
@@ -36,6 +51,9 @@ def split_path(path: str) -> List[str]:
         return []
     if not isinstance(path, str):
         path = str(path)
+    if '\\' not in path:
+        # Nothing is escaped, so every '.' is a separator.
+        return [p for p in path.split('.') if p]
 
     parts: List[str] = []
     buf: List[str] = []
@@ -64,3 +82,33 @@ def split_path(path: str) -> List[str]:
 
     parts.append(unescape_path_segment(''.join(buf)))
     return [p for p in parts if p != '']
+
+
+@dataclass(frozen=True)
+class FieldPath:
+    """A dot path parsed into its key tuple.
+
+    Lookups and root prefix checks work on `parts`; the UI and the field
+    mappings keep using the dot-path strings the paths were parsed from.
+    """
+
+    parts: Tuple[str, ...]
+
+    def is_under(self, root: 'FieldPath') -> bool:
+        """True if this path lies strictly below root (tuple prefix compare)."""
+        n = len(root.parts)
+        return len(self.parts) > n and self.parts[:n] == root.parts
+
+    def relative_to(self, root: 'FieldPath') -> Tuple[str, ...]:
+        return self.parts[len(root.parts):]
+
+
+@lru_cache(maxsize=4096)
+def parse_field_path(path: str) -> FieldPath:
+    """Parse a dot path once; repeated paths share one cached FieldPath."""
+    return FieldPath(tuple(split_path(path)))
+
+
+def compile_path(path: str) -> Tuple[str, ...]:
+    """Return the cached key tuple for a dot path."""
+    return parse_field_path(path).parts
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Set
+import threading
+from collections import OrderedDict
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, List, Set, Tuple
 
 from .accessors import get_value_by_path
-from .schema_utils import extract_all_keys
+from .paths import escape_path_segment
+from .schema_utils import JSON_SCALAR_TYPES, extract_all_keys
 
 
 def resolve_items_by_root(data: Any, root_path: str = '(root)') -> List[Any]:
@@ -32,12 +36,23 @@ def resolve_groups_for_merge(data: Any, root_path: str = '(root)'):
     - dict (single record) -> one group with one record
     """
     items = resolve_items_by_root(data, root_path)
-    grouped = False
-    groups: List[List[Dict[str, Any]]] = []
+    # Collect the entry types in one C-level pass; JSON roots hold only a
+    # handful of distinct types, so subclass checks on the set are free.
+    entry_types = set(map(type, items))
+    grouped = any(issubclass(t, list) for t in entry_types)
+
+    # A root that is list[dict] keeps its original shape as a single group,
+    # filtered in one pass rather than wrapped per dict and re-flattened.
+    if not grouped:
+        if entry_types <= {dict}:
+            flat: List[Dict[str, Any]] = list(items)
+        else:
+            flat = [entry for entry in items if isinstance(entry, dict)]
+        return ([flat] if flat else []), False
 
+    groups: List[List[Dict[str, Any]]] = []
     for entry in items:
         if isinstance(entry, list):
-            grouped = True
             group = [x for x in entry if isinstance(x, dict)]
             groups.append(group)
         elif isinstance(entry, dict):
@@ -45,37 +60,92 @@ def resolve_groups_for_merge(data: Any, root_path: str = '(root)'):
         else:
             continue
 
-    # If root itself is a list[dict], the loop above creates one group per dict.
-    # Collapse that into a single group to preserve the original list shape.
-    if not grouped and groups:
-        flat: List[Dict[str, Any]] = [rec for g in groups for rec in g]
-        groups = [flat]
+    return groups, grouped
+
 
+# Preview, export and the document counter resolve the same root of the same
+# document back to back; keep the last few results so they share one walk.
+# Entries hold the document and are checked by identity, so a recycled id()
+# never returns another document's groups. Gradio runs handlers for every
+# session on worker threads, so all access goes through the lock.
+_GROUPS_CACHE_SIZE = 4
+_groups_cache: "OrderedDict[Tuple[int, str], Tuple[Any, List[List[Dict[str, Any]]], bool]]" = OrderedDict()
+_groups_lock = threading.Lock()
+
+
+def _cached_groups(data: Any, root_path: str):
+    """Return the cached `(groups, grouped)` for data and root_path, or None."""
+    key = (id(data), root_path)
+    with _groups_lock:
+        cached = _groups_cache.get(key)
+        if cached is None or cached[0] is not data:
+            return None
+        _groups_cache.move_to_end(key)
+        return cached[1], cached[2]
+
+
+def resolve_groups_cached(data: Any, root_path: str = '(root)'):
+    """Memoized `resolve_groups_for_merge`; callers must not mutate the result."""
+    cached = _cached_groups(data, root_path)
+    if cached is not None:
+        return cached
+
+    groups, grouped = resolve_groups_for_merge(data, root_path)
+    with _groups_lock:
+        _groups_cache[(id(data), root_path)] = (data, groups, grouped)
+        if len(_groups_cache) > _GROUPS_CACHE_SIZE:
+            _groups_cache.popitem(last=False)
     return groups, grouped
 
 
-def resolve_field_value(data: Any, item: Any, field_path: str, root_path: str):
-    if root_path in (None, '', '(root)'):
-        return get_value_by_path(item, field_path)
+def clear_groups_cache() -> None:
+    with _groups_lock:
+        _groups_cache.clear()
 
-    prefix = f"{root_path}."
-    if field_path == root_path:
-        return item
-    if field_path.startswith(prefix):
-        rel_path = field_path[len(prefix):]
-        return get_value_by_path(item, rel_path)
-    return get_value_by_path(data, field_path)
 
+def iter_root_records(data: Any, root_path: str = '(root)') -> Iterator[Dict[str, Any]]:
+    """Lazily yield the records of `resolve_groups_for_merge`, in the same order.
 
-def extract_record_keys(data: Any, root_path: str, sample_size: int = 50) -> List[str]:
-    """Extract dot-path keys relative to items under the selected root."""
-    groups, _ = resolve_groups_for_merge(data, root_path)
+    Nothing is built up front, so callers that stop early (previews) only
+    touch the entries they consume. Already-resolved groups are reused.
+    """
+    cached = _cached_groups(data, root_path)
+    if cached is not None:
+        yield from chain.from_iterable(cached[0])
+        return
+
+    for entry in resolve_items_by_root(data, root_path):
+        if isinstance(entry, list):
+            for x in entry:
+                if isinstance(x, dict):
+                    yield x
+        elif isinstance(entry, dict):
+            yield entry
+
+
+def extract_record_keys(
+    data: Any,
+    root_path: str,
+    sample_size: int = 50,
+    ordered: bool = True,
+    strict_schema: bool = False,
+) -> List[str]:
+    """Extract dot-path keys relative to items under the selected root.
+
+    Records whose values are all scalars contribute exactly their own keys,
+    so those are unioned raw in C and escaped once per distinct key; only
+    nested records are walked. With `ordered=False` the keys are returned
+    unsorted, for callers that only use them as a set. `strict_schema` has
+    the same meaning as in extract_all_keys.
+    """
     keys: Set[str] = set()
-    remaining = max(0, int(sample_size))
-    for group in groups:
-        for record in group:
-            keys.update(extract_all_keys(record))
-            remaining -= 1
-            if remaining <= 0:
-                return sorted(keys)
-    return sorted(keys)
+    flat_keys: Set[Any] = set()
+    is_flat = JSON_SCALAR_TYPES.issuperset
+    # Only the sampled records are visited; the groups are never built here.
+    for record in islice(iter_root_records(data, root_path), max(1, int(sample_size))):
+        if is_flat(map(type, record.values())):
+            flat_keys.update(record)
+        else:
+            extract_all_keys(record, strict_schema=strict_schema, into=keys)
+    keys.update(map(escape_path_segment, flat_keys))
+    return sorted(keys) if ordered else list(keys)
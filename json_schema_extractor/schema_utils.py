@@ -1,86 +1,196 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Set
+from collections import deque
+from typing import Any, List, Optional, Set, Tuple
 
-from .paths import escape_path_segment, split_path
+from .paths import escape_path_segment
 
 
-def build_tree_from_keys(keys: List[str]) -> Dict[str, Any]:
-    """Convert dot-notation keys into a nested dictionary tree.
+# Exact types json.loads produces for leaves, shared by the key walkers here
+# and the flat-record check in records.py. Hot walkers test `type(v)`
+# against these and the container types by identity, falling back to
+# isinstance only for other types (e.g. dict/list subclasses).
+JSON_SCALAR_TYPES = frozenset((str, int, float, bool, type(None)))
 
-    Leaf nodes are strings (the full path).
-    Branch nodes are dictionaries.
-    If a node is both a leaf and a branch (e.g. 'a' and 'a.b'),
-    the value for 'a' is stored in the dictionary under '__self__'.
+# Lists longer than this are checked for a uniform record shape before being
+# walked in full; see _homogeneous_list_keys.
+HOMOGENEOUS_SAMPLE = 8
+
+
+def _homogeneous_list_keys(items: List[Any], parent: str, sep: str) -> Optional[Set[str]]:
+    """Return the shared key set of a uniform list of dicts, or None.
+
+    Only lists with more than HOMOGENEOUS_SAMPLE elements, all of them dicts,
+    qualify. If the first HOMOGENEOUS_SAMPLE elements yield identical key sets
+    the remaining elements are assumed to match and are not walked.
     """
-    tree: Dict[str, Any] = {}
-    for key in sorted(keys):
-        parts = split_path(key)
-        if not parts:
-            continue
-        current = tree
-        for part in parts[:-1]:
-            if part not in current:
-                current[part] = {}
-
-            # If we encounter a node that was previously a leaf, convert it to a dict
-            if isinstance(current[part], str):
-                current[part] = {'__self__': current[part]}
-
-            current = current[part]
-
-        last_part = parts[-1]
-        if last_part in current:
-            # If it's already a dict, add self
-            if isinstance(current[last_part], dict):
-                current[last_part]['__self__'] = key
-        else:
-            current[last_part] = key
-    return tree
-
-
-def extract_all_keys(data: Any, parent_key: str = '', sep: str = '.') -> Set[str]:
-    """Recursively find all possible keys in a JSON structure (dict or list of dicts)."""
-    keys: Set[str] = set()
+    if len(items) <= HOMOGENEOUS_SAMPLE:
+        return None
+    for item in items:
+        if type(item) is not dict and not isinstance(item, dict):
+            return None
 
-    if isinstance(data, dict):
-        for k, v in data.items():
-            escaped_k = escape_path_segment(k)
-            current_key = f"{parent_key}{sep}{escaped_k}" if parent_key else escaped_k
-            if isinstance(v, (dict, list)):
-                keys.update(extract_all_keys(v, current_key, sep))
-            else:
-                keys.add(current_key)
-    elif isinstance(data, list):
-        for item in data:
-            if isinstance(item, (dict, list)):
-                keys.update(extract_all_keys(item, parent_key, sep))
-            else:
-                if parent_key:
-                    keys.add(parent_key)
-    else:
-        if parent_key:
-            keys.add(parent_key)
+    shared: Optional[Set[str]] = None
+    for item in items[:HOMOGENEOUS_SAMPLE]:
+        item_keys = extract_all_keys(item, parent, sep)
+        if shared is None:
+            shared = item_keys
+        elif item_keys != shared:
+            return None
+    return shared
+
+
+def extract_all_keys(
+    data: Any,
+    parent_key: str = '',
+    sep: str = '.',
+    strict_schema: bool = False,
+    into: Optional[Set[str]] = None,
+) -> Set[str]:
+    """Find all possible keys in a JSON structure (dict or list of dicts).
+
+    Walks the structure iteratively with an explicit stack so deep documents
+    don't pay per-node call overhead or intermediate set merges. Long lists of
+    uniformly shaped dicts are sampled rather than walked in full unless
+    `strict_schema` is set. Keys are added to `into` when given (and it is
+    returned), so callers scanning many records can share one set.
+    """
+    keys: Set[str] = set() if into is None else into
+    stack = deque([(data, parent_key)])
+    push = stack.append
+    pop = stack.pop
+
+    while stack:
+        node, parent = pop()
+        t = type(node)
+        if t is dict or (t is not list and isinstance(node, dict)):
+            for k, v in node.items():
+                escaped_k = escape_path_segment(k)
+                current_key = f"{parent}{sep}{escaped_k}" if parent else escaped_k
+                tv = type(v)
+                if tv in JSON_SCALAR_TYPES:
+                    keys.add(current_key)
+                elif tv is dict or tv is list or isinstance(v, (dict, list)):
+                    push((v, current_key))
+                else:
+                    keys.add(current_key)
+        elif t is list or isinstance(node, list):
+            if not strict_schema:
+                sampled = _homogeneous_list_keys(node, parent, sep)
+                if sampled is not None:
+                    keys |= sampled
+                    continue
+            has_primitive = False
+            for item in node:
+                ti = type(item)
+                if ti is dict or ti is list or (ti not in JSON_SCALAR_TYPES and isinstance(item, (dict, list))):
+                    push((item, parent))
+                else:
+                    has_primitive = True
+            if has_primitive and parent:
+                keys.add(parent)
+        elif parent:
+            keys.add(parent)
 
     return keys
 
 
 def find_list_paths(data: Any, parent_key: str = '', sep: str = '.') -> List[str]:
-    """Find all paths in the JSON that point to a list."""
+    """Find all paths in the JSON that point to a list.
+
+    Descends into dicts and into the first element of each list when it is
+    a dict, walking an explicit stack into one shared list that is sorted
+    once at the end.
+    """
     paths: List[str] = []
-    if isinstance(data, dict):
-        for k, v in data.items():
+    if isinstance(data, list):
+        if parent_key:
+            return paths
+        paths.append("(root)")
+        data = data[0] if data and isinstance(data[0], dict) else None
+    elif not isinstance(data, dict):
+        return paths
+
+    stack = [(data, parent_key)] if data is not None else []
+    push = stack.append
+    pop = stack.pop
+    append = paths.append
+    while stack:
+        node, parent = pop()
+        for k, v in node.items():
             escaped_k = escape_path_segment(k)
-            current_key = f"{parent_key}{sep}{escaped_k}" if parent_key else escaped_k
-            if isinstance(v, list):
-                paths.append(current_key)
+            current_key = f"{parent}{sep}{escaped_k}" if parent else escaped_k
+            t = type(v)
+            if t is list or (t is not dict and isinstance(v, list)):
+                append(current_key)
                 if v and isinstance(v[0], dict):
-                    paths.extend(find_list_paths(v[0], current_key, sep))
-            elif isinstance(v, dict):
-                paths.extend(find_list_paths(v, current_key, sep))
-    elif isinstance(data, list):
-        if not parent_key:
-            paths.append("(root)")
-            if data and isinstance(data[0], dict):
-                paths.extend(find_list_paths(data[0], "", sep))
-    return sorted(paths)
+                    push((v[0], current_key))
+            elif t is dict or isinstance(v, dict):
+                push((v, current_key))
+
+    paths.sort()
+    return paths
+
+
+def scan_schema(data: Any, sep: str = '.', strict_schema: bool = False) -> Tuple[Set[str], List[str]]:
+    """Return `(extract_all_keys(data), find_list_paths(data))` from a single walk.
+
+    Each stack entry carries a `visible` flag that mirrors the containers
+    find_list_paths descends into: dicts, and the first element of a list
+    when it is a dict. `strict_schema` has the same meaning as in
+    extract_all_keys.
+    """
+    keys: Set[str] = set()
+    list_paths: List[str] = []
+    stack = deque([(data, '', True)])
+    push = stack.append
+    pop = stack.pop
+
+    if isinstance(data, list):
+        list_paths.append("(root)")
+
+    while stack:
+        node, parent, visible = pop()
+        t = type(node)
+        if t is dict or (t is not list and isinstance(node, dict)):
+            for k, v in node.items():
+                escaped_k = escape_path_segment(k)
+                current_key = f"{parent}{sep}{escaped_k}" if parent else escaped_k
+                tv = type(v)
+                if tv in JSON_SCALAR_TYPES:
+                    keys.add(current_key)
+                elif tv is list or (tv is not dict and isinstance(v, list)):
+                    if visible:
+                        list_paths.append(current_key)
+                    push((v, current_key, visible))
+                elif tv is dict or isinstance(v, dict):
+                    push((v, current_key, visible))
+                else:
+                    keys.add(current_key)
+        elif t is list or isinstance(node, list):
+            if not strict_schema:
+                sampled = _homogeneous_list_keys(node, parent, sep)
+                if sampled is not None:
+                    keys |= sampled
+                    if visible:
+                        # List paths still come from the first element.
+                        push((node[0], parent, True))
+                    continue
+            has_primitive = False
+            for idx, item in enumerate(node):
+                ti = type(item)
+                if ti in JSON_SCALAR_TYPES:
+                    has_primitive = True
+                elif ti is dict or (ti is not list and isinstance(item, dict)):
+                    push((item, parent, visible and idx == 0))
+                elif ti is list or isinstance(item, list):
+                    push((item, parent, False))
+                else:
+                    has_primitive = True
+            if has_primitive and parent:
+                keys.add(parent)
+        elif parent:
+            keys.add(parent)
+
+    list_paths.sort()
+    return keys, list_paths
@@ -0,0 +1,324 @@
+"""Randomized check of field lookup and export rows against a frozen reference.
+
+Builds random documents (nested dicts, lists of records, lists of lists,
+dotted and escaped keys) and compares the package's `split_path`,
+`get_value_by_path`, `resolve_groups_for_merge`, `iter_export_rows`,
+`iter_export_tuples` and `flatten_data_for_preview` with the original
+string-path implementation frozen below. Run it after changing the paths,
+accessors, record grouping or the projector:
+
+    python scripts/check_projector.py [iterations] [seed]
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import sys
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json_schema_extractor.accessors import get_value_by_path  # noqa: E402
+from json_schema_extractor.flattening import (  # noqa: E402
+    flatten_data_for_preview,
+    iter_export_rows,
+    iter_export_tuples,
+)
+from json_schema_extractor.paths import split_path  # noqa: E402
+from json_schema_extractor.records import resolve_groups_for_merge  # noqa: E402
+from json_schema_extractor.schema_utils import extract_all_keys, find_list_paths  # noqa: E402
+
+
+# --- Frozen reference ---------------------------------------------------------
+# The original string-path implementation, copied as it was before the
+# performance work. Do not "fix" or speed these up: they define the expected
+# behaviour.
+
+def ref_unescape_path_segment(segment: str) -> str:
+    if segment is None:
+        return ''
+    out: List[str] = []
+    i = 0
+    while i < len(segment):
+        ch = segment[i]
+        if ch == '\\' and i + 1 < len(segment):
+            out.append(segment[i + 1])
+            i += 2
+        else:
+            out.append(ch)
+            i += 1
+    return ''.join(out)
+
+
+def ref_split_path(path: str) -> List[str]:
+    if path is None:
+        return []
+    if not isinstance(path, str):
+        path = str(path)
+
+    parts: List[str] = []
+    buf: List[str] = []
+    escaping = False
+
+    for ch in path:
+        if escaping:
+            buf.append('\\')
+            buf.append(ch)
+            escaping = False
+            continue
+
+        if ch == '\\':
+            escaping = True
+            continue
+        if ch == '.':
+            parts.append(ref_unescape_path_segment(''.join(buf)))
+            buf = []
+            continue
+        buf.append(ch)
+
+    if escaping:
+        buf.append('\\')
+
+    parts.append(ref_unescape_path_segment(''.join(buf)))
+    return [p for p in parts if p != '']
+
+
+def ref_get_value_by_path(data: Any, path: str) -> Any:
+    keys = ref_split_path(path)
+    val = data
+
+    def collect_values(container, key):
+        results = []
+        if isinstance(container, dict):
+            v = container.get(key, None)
+            if v is not None:
+                results.append(v)
+        elif isinstance(container, list):
+            for item in container:
+                results.extend(collect_values(item, key))
+        return results
+
+    try:
+        i = 0
+        while i < len(keys):
+            key = keys[i]
+
+            if isinstance(val, dict):
+                if key in val:
+                    val = val.get(key)
+                    i += 1
+                else:
+                    matched = False
+                    if i + 1 < len(keys):
+                        candidate = key
+                        for j in range(i + 1, len(keys)):
+                            candidate = candidate + '.' + keys[j]
+                            if candidate in val:
+                                val = val.get(candidate)
+                                i = j + 1
+                                matched = True
+                                break
+                    if not matched:
+                        return None
+
+            elif isinstance(val, list):
+                val = collect_values(val, key)
+                i += 1
+                if not val:
+                    return None
+            else:
+                return None
+
+            if val is None:
+                return None
+
+        return val
+    except Exception:
+        return None
+
+
+def ref_resolve_items_by_root(data: Any, root_path: str = '(root)') -> List[Any]:
+    if data is None:
+        return []
+
+    if root_path in (None, '', '(root)'):
+        if isinstance(data, list):
+            return data
+        return [data]
+
+    target = ref_get_value_by_path(data, root_path)
+    if isinstance(target, list):
+        return target
+    if target is not None:
+        return [target]
+    return []
+
+
+def ref_resolve_groups_for_merge(data: Any, root_path: str = '(root)'):
+    items = ref_resolve_items_by_root(data, root_path)
+    grouped = False
+    groups: List[List[Dict[str, Any]]] = []
+
+    for entry in items:
+        if isinstance(entry, list):
+            grouped = True
+            group = [x for x in entry if isinstance(x, dict)]
+            groups.append(group)
+        elif isinstance(entry, dict):
+            groups.append([entry])
+        else:
+            continue
+
+    if not grouped and groups:
+        flat: List[Dict[str, Any]] = [rec for g in groups for rec in g]
+        groups = [flat]
+
+    return groups, grouped
+
+
+def ref_resolve_field_value(data: Any, item: Any, field_path: str, root_path: str):
+    if root_path in (None, '', '(root)'):
+        return ref_get_value_by_path(item, field_path)
+
+    prefix = f"{root_path}."
+    if field_path == root_path:
+        return item
+    if field_path.startswith(prefix):
+        rel_path = field_path[len(prefix):]
+        return ref_get_value_by_path(item, rel_path)
+    return ref_get_value_by_path(data, field_path)
+
+
+def ref_flatten_data_for_export(data: Any, selected_fields: List[str], mapping: Dict[str, str], root_path: str):
+    rows: List[Dict[str, Any]] = []
+    groups, _ = ref_resolve_groups_for_merge(data, root_path)
+    records = [rec for group in groups for rec in group]
+
+    for record in records:
+        row: Dict[str, Any] = {}
+        for field in selected_fields:
+            val = ref_resolve_field_value(data, record, field, root_path)
+
+            if isinstance(val, list):
+                if all(isinstance(v, (str, int, float, bool)) or v is None for v in val):
+                    val = ", ".join(["" if v is None else str(v) for v in val])
+                else:
+                    try:
+                        val = json.dumps(val, ensure_ascii=False)
+                    except TypeError:
+                        val = str(val)
+
+            row[mapping.get(field, field)] = val
+        rows.append(row)
+
+    return rows
+
+
+# --- Random inputs ------------------------------------------------------------
+
+KEYS = ['a', 'b', 'c', 'b.c', 'x\\y', 'id', 'gpt-3.5']
+SCALARS = [0, 1, 2.5, 's', 'a,b', '', None, True, False, 'é']
+
+
+def random_value(rng: random.Random, depth: int = 0):
+    r = rng.random()
+    if depth > 3 or r < 0.4:
+        return rng.choice(SCALARS)
+    if r < 0.7:
+        return {rng.choice(KEYS): random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))}
+    if r < 0.85:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return [random_record(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+
+
+def random_record(rng: random.Random, depth: int = 0):
+    return {rng.choice(KEYS): random_value(rng, depth + 1) for _ in range(rng.randint(0, 5))}
+
+
+def random_document(rng: random.Random):
+    shape = rng.random()
+    records = [random_record(rng) for _ in range(rng.randint(0, 6))]
+    if shape < 0.4:
+        return records
+    if shape < 0.55:
+        return [records[:2], records[2:], rng.choice(SCALARS)]
+    if shape < 0.8:
+        return {'meta': random_value(rng), 'items': records, 'a': {'rows': records}}
+    return random_value(rng)
+
+
+def random_fields(rng: random.Random, data, root_path: str):
+    known = sorted(extract_all_keys(data, strict_schema=True))
+    invented = ['.'.join(rng.choice(KEYS).replace('.', '\\.') if rng.random() < 0.3 else rng.choice(KEYS)
+                         for _ in range(rng.randint(1, 3)))
+                for _ in range(3)]
+    if root_path != '(root)':
+        invented += [root_path, root_path + '.' + rng.choice(KEYS)]
+    pool = known + invented
+    return [rng.choice(pool) for _ in range(rng.randint(1, 6))]
+
+
+def odd_spellings(fields: List[str]) -> List[str]:
+    """Empty segments, stray dots and dangling escapes around each field.
+
+    Only the accessor checks use these: root-relative fields are classified
+    by key tuple rather than by string prefix, so a spelling like '.items.a'
+    is deliberately read relative to the 'items' root.
+    """
+    odd: List[str] = []
+    for f in fields:
+        odd += ['.' + f, f + '.', f.replace('.', '..'), f + '\\', '\\' + f, f.replace('\\', '')]
+    return odd
+
+
+def main(iterations: int = 2000, seed: int = 0) -> int:
+    rng = random.Random(seed)
+    checked = 0
+    for i in range(iterations):
+        data = random_document(rng)
+        for root_path in ['(root)'] + find_list_paths(data):
+            fields = random_fields(rng, data, root_path)
+            # Some fields share an output name, which exercises last-wins rows.
+            mapping = {f: rng.choice([f, f.upper(), 'dup']) for f in fields}
+            names = [mapping.get(f, f) for f in fields]
+            lookups = fields + odd_spellings(fields)
+
+            expected = ref_flatten_data_for_export(data, fields, mapping, root_path)
+            cases = {
+                'resolve_groups_for_merge': (
+                    resolve_groups_for_merge(data, root_path),
+                    ref_resolve_groups_for_merge(data, root_path),
+                ),
+                'split_path': ([split_path(f) for f in lookups], [ref_split_path(f) for f in lookups]),
+                'get_value_by_path': (
+                    [get_value_by_path(data, f) for f in lookups],
+                    [ref_get_value_by_path(data, f) for f in lookups],
+                ),
+                'iter_export_rows': (list(iter_export_rows(data, fields, mapping, root_path)), expected),
+                'iter_export_tuples': (
+                    list(iter_export_tuples(data, fields, mapping, root_path)),
+                    [tuple(row[n] for n in names) for row in expected],
+                ),
+                'flatten_data_for_preview': (
+                    flatten_data_for_preview(data, fields, mapping, root_path, limit=3),
+                    expected[:3],
+                ),
+            }
+            for name, (got, want) in cases.items():
+                if got != want:
+                    print(f"MISMATCH in {name} (iteration {i}, seed {seed})")
+                    print(f"  data:   {data!r}")
+                    print(f"  root:   {root_path!r}")
+                    print(f"  fields: {fields!r}")
+                    print(f"  got:    {got!r}")
+                    print(f"  want:   {want!r}")
+                    return 1
+            checked += 1
+    print(f"OK: {checked} documents/roots checked")
+    return 0
+
+
+if __name__ == '__main__':
+    args = [int(a) for a in sys.argv[1:3]]
+    sys.exit(main(*args))